@@ -1,5 +1,6 @@
 import yt_dlp
 import sys
+import tracing
 
 def list_captions(url):
     ydl_opts = {
@@ -8,7 +9,9 @@ def list_captions(url):
     }
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
+        tracing.instrument_ydl(ydl)
+        with tracing.span("extract_info", url=url):
+            info = ydl.extract_info(url, download=False)
 
     subtitles = info.get("subtitles", {})
     auto_subs = info.get("automatic_captions", {})
@@ -46,8 +49,15 @@ def download_caption(url, lang, is_auto):
         "quiet": False,
     }
 
+    tracing.add_ydl_hooks(ydl_opts)
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+        tracing.instrument_ydl(ydl)
+        # Same as ydl.download([url]), split so extraction is timed on its own
+        with tracing.span("extract_info", url=url):
+            info = ydl.extract_info(url, download=False, process=False)
+        with tracing.span("download_caption", url=url, lang=lang):
+            ydl.process_ie_result(info, download=True)
 
 
 def main():
@@ -1,5 +1,7 @@
 import re
+import tracing
 
+@tracing.traced("srt_to_text")
 def srt_to_text(input_file, output_file):
     with open(input_file, "r", encoding="utf-8") as f:
         content = f.read()
@@ -2,11 +2,24 @@ import os
 import subprocess
 import json
 import re
+import threading
+import queue
+import tempfile
+
+import tracing
+
+try:
+    import transcript_dedupe
+except ImportError:  # numpy not installed; skip near-duplicate indexing
+    transcript_dedupe = None
 
 CHANNEL_URL = "https://www.youtube.com/@veritasium"
 CHANNEL_NAME = "Veritasium"
 BASE_DIR = os.path.join(os.getcwd(), CHANNEL_NAME)
 
+# Listing entries buffered ahead of caption fetching
+QUEUE_SIZE = 256
+
 os.makedirs(BASE_DIR, exist_ok=True)
 
 
@@ -14,26 +27,119 @@ def sanitize_filename(name):
     return re.sub(r'[\\/*?:"<>|]', "", name)
 
 
-def get_video_list():
-    print("Fetching video list...")
-    cmd = [
-        "yt-dlp",
-        "--dump-json",
-        "--flat-playlist",
-        CHANNEL_URL
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    videos = []
-
-    for line in result.stdout.splitlines():
-        data = json.loads(line)
-        videos.append({
-            "id": data["id"],
-            "title": sanitize_filename(data["title"])
-        })
-
-    return videos
+class VideoList:
+    """Channel listing streamed from `yt-dlp --dump-json --flat-playlist`.
+
+    Each iteration runs yt-dlp again, yields videos as it prints them and
+    raises subprocess.CalledProcessError if it fails. terminate() may be
+    called from another thread to stop a listing that is waiting on yt-dlp;
+    after that, iterating yields nothing.
+    """
+
+    def __init__(self, url=CHANNEL_URL):
+        self.url = url
+        self.proc = None
+        self.terminated = False
+
+    def __iter__(self):
+        if self.terminated:
+            return
+        print("Fetching video list...")
+        cmd = [
+            "yt-dlp",
+            "--dump-json",
+            "--flat-playlist",
+            self.url
+        ]
+
+        with tempfile.TemporaryFile() as stderr:
+            self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True, bufsize=1)
+            try:
+                for line in self.proc.stdout:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    yield {
+                        "id": data["id"],
+                        "title": sanitize_filename(data["title"])
+                    }
+
+                self.proc.wait()
+                if self.proc.returncode and not self.terminated:
+                    stderr.seek(0)
+                    message = stderr.read().decode("utf-8", "replace").strip()
+                    raise subprocess.CalledProcessError(self.proc.returncode, cmd, stderr=message)
+            finally:
+                self._stop_process()
+                self.proc.stdout.close()
+                self.proc.wait()
+
+    def terminate(self):
+        self.terminated = True
+        self._stop_process()
+
+    def _stop_process(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+
+
+def get_video_list(url=CHANNEL_URL):
+    """Return the channel's videos as a stream (see VideoList)."""
+    return VideoList(url)
+
+
+def prefetch(videos, maxsize=QUEUE_SIZE):
+    """Read videos on a background thread so the listing keeps going while
+    captions are fetched. At most maxsize entries are held in memory.
+
+    If the consumer stops early, videos.terminate() (when present) is called
+    so the reader is not left waiting on the next line.
+    """
+    q = queue.Queue(maxsize=maxsize)
+    done = object()
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        it = iter(videos)
+        try:
+            with tracing.span("list_videos"):
+                for video in it:
+                    if not put(video):
+                        break
+        except Exception as e:
+            if not stop.is_set():
+                errors.append(e)
+        finally:
+            if hasattr(it, "close"):
+                it.close()
+            put(done)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        if hasattr(videos, "terminate"):
+            videos.terminate()
+        thread.join(timeout=1)
+
+    if errors:
+        raise errors[0]
 
 
 def download_captions(video):
@@ -51,9 +157,11 @@ def download_captions(video):
         video_url
     ]
 
-    subprocess.run(cmd, capture_output=True)
+    with tracing.span("yt-dlp --write-subs", id=video["id"]):
+        subprocess.run(cmd, capture_output=True)
 
 
+@tracing.traced("vtt_to_text")
 def vtt_to_text(vtt_path):
     text = []
     with open(vtt_path, "r", encoding="utf-8") as f:
@@ -66,7 +174,10 @@ def vtt_to_text(vtt_path):
     return " ".join(text)
 
 
+@tracing.traced("process_subtitles")
 def process_subtitles(video):
+    """Convert the video's .vtt files to a .txt transcript; return its path, or None."""
+    saved = None
     for file in os.listdir(BASE_DIR):
         if file.startswith(video["title"]) and file.endswith(".vtt"):
             vtt_path = os.path.join(BASE_DIR, file)
@@ -80,19 +191,40 @@ def process_subtitles(video):
 
             os.remove(vtt_path)
             print(f"Saved captions: {video['title']}")
+            saved = txt_path
 
+    return saved
 
-def main():
-    videos = get_video_list()
-    print(f"Found {len(videos)} videos")
-
-    for video in videos:
-        print(f"Processing: {video['title']}")
-        download_captions(video)
-        process_subtitles(video)
 
+def main():
+    # Index transcripts as they are saved; the index is written even if the
+    # scrape is interrupted and refreshed for untouched files afterwards.
+    indexer = transcript_dedupe.TranscriptIndexer(BASE_DIR) if transcript_dedupe else None
+
+    count = 0
+    try:
+        for video in prefetch(get_video_list()):
+            count += 1
+            print(f"Processing: {video['title']}")
+            with tracing.span("video", id=video["id"]):
+                download_captions(video)
+                txt_path = process_subtitles(video)
+            if indexer is not None and txt_path:
+                indexer.add(txt_path)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Failed to fetch video list: {e.stderr or e}")
+        print(f"Processed {count} videos")
+        return
+    finally:
+        if indexer is not None:
+            indexer.save()
+
+    print(f"Processed {count} videos")
     print("✅ ALL CAPTIONS SCRAPED SUCCESSFULLY")
 
+    if indexer is not None:
+        indexer.refresh()
+
 
 if __name__ == "__main__":
     main()
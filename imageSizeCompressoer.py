@@ -2,6 +2,9 @@ import os
 import sys
 from PIL import Image
 
+import tracing
+
+@tracing.traced("compress_image")
 def compress_image(input_path, target_size_kb, output_path=None):
     """
     Compress an image to approximately the target file size in KB while maintaining aspect ratio.
@@ -22,7 +25,8 @@ def compress_image(input_path, target_size_kb, output_path=None):
 
     # Open image
     try:
-        img = Image.open(input_path)
+        with tracing.span("open_image"):
+            img = Image.open(input_path)
     except Exception as e:
         print(f"Error opening image: {e}")
         return
@@ -58,9 +62,11 @@ def compress_image(input_path, target_size_kb, output_path=None):
         if scale_factor < 1:
             new_width = max(1, int(width * scale_factor))
             new_height = max(1, int(height * scale_factor))
-            img_copy = img_copy.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            with tracing.span("resize"):
+                img_copy = img_copy.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
-        img_copy.save(output_path, 'JPEG', quality=quality, optimize=True)
+        with tracing.span("encode", quality=quality):
+            img_copy.save(output_path, 'JPEG', quality=quality, optimize=True)
         current_size = os.path.getsize(output_path) / 1024
 
         if abs(current_size - target_size_kb) < abs(best_size - target_size_kb):
@@ -77,9 +83,11 @@ def compress_image(input_path, target_size_kb, output_path=None):
     if scale_factor < 1:
         new_width = max(1, int(width * scale_factor))
         new_height = max(1, int(height * scale_factor))
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        with tracing.span("resize"):
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
-    img.save(output_path, 'JPEG', quality=best_quality, optimize=True)
+    with tracing.span("encode", quality=best_quality):
+        img.save(output_path, 'JPEG', quality=best_quality, optimize=True)
     final_size = os.path.getsize(output_path) / 1024
     print(f"Compressed image saved to: {output_path}")
     print(f"Final size: {final_size:.2f} KB (target: {target_size_kb} KB)")
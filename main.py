@@ -1,6 +1,7 @@
 import yt_dlp
 import os
 import sys
+import tracing
 
 def clear_screen():
     """Clear the terminal screen"""
@@ -43,7 +44,9 @@ def get_video_info(url):
     
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+            tracing.instrument_ydl(ydl)
+            with tracing.span("extract_info", url=url):
+                info = ydl.extract_info(url, download=False)
             return info
     except Exception as e:
         print(f"\n[ERROR] Failed to fetch video info: {str(e)}")
@@ -61,6 +64,7 @@ def display_video_info(info):
     print(f"Upload Date: {info.get('upload_date', 'N/A')}")
     print("="*70)
 
+@tracing.traced("display_formats")
 def display_formats(info):
     """Display available video formats with quality, size, and format info"""
     print("\n" + "="*70)
@@ -173,10 +177,17 @@ def download_video(url, format_id, output_name, start_time=None, end_time=None):
             'preferedformat': 'mp4',
         }]
     
+    tracing.add_ydl_hooks(ydl_opts)
+    
     try:
         print("\n[*] Starting download...")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+            tracing.instrument_ydl(ydl)
+            # Same as ydl.download([url]), split so extraction is timed on its own
+            with tracing.span("extract_info", url=url):
+                info = ydl.extract_info(url, download=False, process=False)
+            with tracing.span("download", url=url, format=format_id):
+                ydl.process_ie_result(info, download=True)
         print(f"\n[SUCCESS] Video downloaded successfully to '{output_path}' folder!")
         return True
     except Exception as e:
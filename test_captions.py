@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+import captions
+
+FAKE_YT_DLP = textwrap.dedent("""\
+    #!{python}
+    import json, os, sys, time
+
+    count = int(os.environ.get("FAKE_COUNT", "5"))
+    delay = float(os.environ.get("FAKE_DELAY", "0"))
+    for i in range(count):
+        print(json.dumps({{"id": f"vid{{i}}", "title": f"Video {{i}}"}}), flush=True)
+        time.sleep(delay)
+    if os.environ.get("FAKE_DONE"):
+        open(os.environ["FAKE_DONE"], "w").close()
+    if os.environ.get("FAKE_ERROR"):
+        print(os.environ["FAKE_ERROR"], file=sys.stderr)
+        sys.exit(1)
+""")
+
+
+@pytest.fixture
+def fake_yt_dlp(tmp_path, monkeypatch):
+    """Put a fake yt-dlp on PATH that prints FAKE_COUNT entries FAKE_DELAY seconds apart."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "yt-dlp"
+    script.write_text(FAKE_YT_DLP.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def configure(**env):
+        for key, value in env.items():
+            monkeypatch.setenv(f"FAKE_{key.upper()}", str(value))
+
+    return configure
+
+
+def test_first_video_arrives_before_listing_finishes(fake_yt_dlp, tmp_path):
+    done = tmp_path / "done"
+    fake_yt_dlp(count=5, delay=0.3, done=done)
+
+    prefetched = captions.prefetch(captions.get_video_list())
+    first = next(prefetched)
+
+    assert first == {"id": "vid0", "title": "Video 0"}
+    assert not done.exists()
+    assert [v["id"] for v in prefetched] == ["vid1", "vid2", "vid3", "vid4"]
+    assert done.exists()
+
+
+def test_prefetch_holds_at_most_maxsize_entries(fake_yt_dlp):
+    fake_yt_dlp(count=100, delay=0)
+    pulled = []
+
+    def counting(videos):
+        for video in videos:
+            pulled.append(video)
+            yield video
+
+    prefetched = captions.prefetch(counting(captions.get_video_list()), maxsize=5)
+    next(prefetched)
+    time.sleep(0.5)
+
+    # One handed out, five queued, one waiting to be queued.
+    assert len(pulled) <= 1 + 5 + 1
+    assert len(list(prefetched)) == 99
+
+
+def test_early_stop_does_not_wait_for_next_line(fake_yt_dlp):
+    fake_yt_dlp(count=3, delay=5)
+    videos = captions.get_video_list()
+    prefetched = captions.prefetch(videos)
+    next(prefetched)
+
+    start = time.monotonic()
+    prefetched.close()
+
+    assert time.monotonic() - start < 2
+    assert videos.proc.wait(timeout=2) is not None
+
+
+def test_failed_listing_raises(fake_yt_dlp):
+    fake_yt_dlp(count=1, error="ERROR: Unable to download channel page")
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        list(captions.prefetch(captions.get_video_list()))
+
+    assert "Unable to download channel page" in excinfo.value.stderr
+
+
+def test_video_list_can_be_iterated_again(fake_yt_dlp):
+    fake_yt_dlp(count=3, delay=0)
+    videos = captions.get_video_list()
+
+    assert [v["id"] for v in videos] == ["vid0", "vid1", "vid2"]
+    assert [v["id"] for v in videos] == ["vid0", "vid1", "vid2"]
+
+    videos.terminate()
+    assert list(videos) == []
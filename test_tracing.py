@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+import tracing
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Enable tracing with a fresh event list and a clock the test advances (in µs)."""
+    clock = FakeClock()
+    monkeypatch.setattr(tracing, "_enabled", True)
+    monkeypatch.setattr(tracing, "_events", [])
+    monkeypatch.setattr(tracing, "_now_us", clock)
+    return clock
+
+
+@pytest.fixture
+def disabled(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", False)
+    monkeypatch.setattr(tracing, "_events", [])
+
+
+def test_nested_spans_self_time(clock):
+    with tracing.span("outer"):
+        clock.now += 1000
+        with tracing.span("inner"):
+            clock.now += 3000
+        clock.now += 1000
+
+    stages = tracing.summary()
+    assert stages["outer"]["total_ms"] == 5
+    assert stages["outer"]["self_ms"] == 2
+    assert stages["inner"]["self_ms"] == 3
+
+
+def test_hook_events_count_as_children(clock):
+    opts = tracing.add_ydl_hooks({})
+    progress = opts["progress_hooks"][0]
+    postprocess = opts["postprocessor_hooks"][0]
+
+    with tracing.span("download"):
+        progress({"status": "downloading", "filename": "a.mp4"})
+        clock.now += 200_000
+        progress({"status": "finished", "filename": "a.mp4", "total_bytes": 42})
+        postprocess({"status": "started", "postprocessor": "Merger"})
+        clock.now += 100_000
+        postprocess({"status": "finished", "postprocessor": "Merger"})
+
+    stages = tracing.summary()
+    assert stages["download"]["total_ms"] == 300
+    assert stages["download"]["self_ms"] == 0
+    assert stages["network_transfer"]["self_ms"] == 200
+    assert stages["postprocess:Merger"]["self_ms"] == 100
+    assert sum(s["self_ms"] for s in stages.values()) == 300
+
+
+def test_chrome_trace_shape(clock):
+    with tracing.span("stage", url="x"):
+        clock.now += 10
+
+    events = tracing.chrome_trace()["traceEvents"]
+    assert len(events) == 1
+    event = events[0]
+    assert event["ph"] == "X"
+    assert event["name"] == "stage"
+    assert event["dur"] == 10
+    assert event["args"] == {"url": "x"}
+    assert "self" not in event
+    assert {"ts", "pid", "tid"} <= event.keys()
+
+
+def test_spans_in_other_threads_stay_separate(clock):
+    def worker():
+        with tracing.span("reader"):
+            clock.now += 40
+
+    with tracing.span("main"):
+        clock.now += 10
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        clock.now += 50
+
+    stages = tracing.summary()
+    assert stages["main"]["self_ms"] == pytest.approx(0.1)
+    assert stages["reader"]["self_ms"] == pytest.approx(0.04)
+    tids = {e["name"]: e["tid"] for e in tracing.chrome_trace()["traceEvents"]}
+    assert tids["main"] != tids["reader"]
+
+
+def test_disabled_tracing_is_a_no_op(disabled):
+    calls = []
+
+    @tracing.traced("work")
+    def work():
+        calls.append(1)
+        return "done"
+
+    with tracing.span("stage"):
+        assert work() == "done"
+
+    opts = {"format": "best"}
+    assert tracing.add_ydl_hooks(opts) == {"format": "best"}
+
+    class FakeYDL:
+        format_selector = staticmethod(lambda ctx: [ctx])
+
+    ydl = FakeYDL()
+    selector = ydl.format_selector
+    assert tracing.instrument_ydl(ydl) is ydl
+    assert ydl.format_selector is selector
+
+    assert calls == [1]
+    assert tracing._events == []
+    assert tracing.span("stage") is tracing._NULL_SPAN
+
+
+def test_instrument_ydl_times_format_selection(clock):
+    class FakeYDL:
+        def __init__(self):
+            self.format_selector = self.select
+
+        def select(self, ctx):
+            clock.now += 7
+            yield ctx
+
+    ydl = tracing.instrument_ydl(FakeYDL())
+    assert ydl.format_selector("fmt") == ["fmt"]
+    assert tracing.summary()["format_selection"]["count"] == 1
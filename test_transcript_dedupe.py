@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+import transcript_dedupe
+from transcript_dedupe import LSHIndex
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def words(n, seed):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(VOCABULARY, size=n))
+
+
+def edited(text, every=50):
+    """Copy of text with every `every`-th word replaced."""
+    out = text.split()
+    for i in range(0, len(out), every):
+        out[i] = "edited"
+    return " ".join(out)
+
+
+def bucket_sets(buckets):
+    return {key: sorted(members) for key, members in buckets.items()}
+
+
+def write_transcript(directory, name, body):
+    path = directory / name
+    path.write_text(f"Title: {name}\nURL: https://www.youtube.com/watch?v=x\n\nWEBVTT Kind: captions Language: en {body}")
+    return path
+
+
+@pytest.fixture
+def corpus():
+    original = words(800, seed=1)
+    clip = words(300, seed=2)
+    return {
+        "original.txt": original,
+        "reupload.txt": edited(original),
+        "clip.txt": clip,
+        "supercut.txt": " ".join([words(1500, seed=3), clip, words(1500, seed=4)]),
+        "other.txt": words(800, seed=5),
+    }
+
+
+def build(corpus):
+    index = LSHIndex()
+    for name, text in corpus.items():
+        index.add(name, text)
+    return index
+
+
+def test_reports_duplicate_and_supercut(corpus):
+    clusters, overlaps = build(corpus).find_matches()
+
+    assert clusters == [["original.txt", "reupload.txt"]]
+    assert [(small, big) for small, big, _, _ in overlaps] == [("clip.txt", "supercut.txt")]
+    assert overlaps[0][3] >= 0.9
+
+
+def test_replace_and_remove_keep_buckets_consistent(corpus):
+    index = build(corpus)
+    pair = (index.names.index("original.txt"), index.names.index("reupload.txt"))
+    assert pair in index.candidate_pairs()
+
+    index.add("reupload.txt", words(800, seed=6))
+    assert pair not in index.candidate_pairs()
+    incremental = bucket_sets(index._buckets), bucket_sets(index._window_buckets)
+    index._rebuild_buckets()
+    assert incremental == (bucket_sets(index._buckets), bucket_sets(index._window_buckets))
+
+    index.add("reupload.txt", edited(corpus["original.txt"]))
+    assert pair in index.candidate_pairs()
+
+    assert index.remove(["original.txt", "missing.txt"]) == 1
+    assert "original.txt" not in index.names
+    assert index.find_matches()[0] == []
+    assert index.find_matches()[1][0][:2] == ("clip.txt", "supercut.txt")
+
+
+def test_empty_documents_are_not_duplicates(corpus):
+    index = build(corpus)
+    index.add("a.txt", "")
+    index.add("b.txt", "  ")
+
+    clusters, overlaps = index.find_matches()
+    assert clusters == [["original.txt", "reupload.txt"]]
+    assert all("a.txt" not in o[:2] and "b.txt" not in o[:2] for o in overlaps)
+    assert index.similarity(index.names.index("a.txt"), index.names.index("b.txt")) == 0.0
+
+
+def test_save_load_round_trip(corpus, tmp_path):
+    index = build(corpus)
+    path = tmp_path / transcript_dedupe.INDEX_FILE
+    index.save(path)
+
+    loaded = LSHIndex.load(path)
+    assert loaded.names == index.names
+    assert loaded.shingle_counts == index.shingle_counts
+    assert all(np.array_equal(a, b) for a, b in zip(loaded.signatures, index.signatures))
+    assert loaded.candidate_pairs() == index.candidate_pairs()
+    assert loaded.find_matches() == index.find_matches()
+    assert not (tmp_path / f"{transcript_dedupe.INDEX_FILE}.tmp").exists()
+
+
+def test_unreadable_index_is_rebuilt(tmp_path):
+    path = tmp_path / transcript_dedupe.INDEX_FILE
+    path.write_bytes(b"truncated")
+    assert LSHIndex.load(path) is None
+
+    write_transcript(tmp_path, "a.txt", words(300, seed=1))
+    assert len(transcript_dedupe.update_index(tmp_path)) == 1
+    assert len(LSHIndex.load(path)) == 1
+
+
+def test_update_index_rehashes_only_changed_files(corpus, tmp_path, monkeypatch):
+    for name, text in corpus.items():
+        write_transcript(tmp_path, name, text)
+
+    read = []
+    read_transcript = transcript_dedupe.read_transcript
+    monkeypatch.setattr(transcript_dedupe, "read_transcript", lambda path: read.append(path) or read_transcript(path))
+
+    transcript_dedupe.update_index(tmp_path)
+    assert len(read) == len(corpus)
+
+    read.clear()
+    transcript_dedupe.update_index(tmp_path)
+    assert read == []
+
+    write_transcript(tmp_path, "other.txt", words(900, seed=7))
+    (tmp_path / "clip.txt").unlink()
+    index = transcript_dedupe.update_index(tmp_path)
+    assert [p.rsplit("/", 1)[-1] for p in map(str, read)] == ["other.txt"]
+    assert "clip.txt" not in index.names
+
+    saved = LSHIndex.load(tmp_path / transcript_dedupe.INDEX_FILE)
+    assert sorted(saved.names) == sorted(index.names)
+
+
+def test_webvtt_preamble_is_stripped(tmp_path):
+    path = write_transcript(tmp_path, "a.txt", "hello world")
+    assert transcript_dedupe.read_transcript(path).split() == ["hello", "world"]
+
+
+def test_indexer_adds_saved_transcripts(corpus, tmp_path):
+    indexer = transcript_dedupe.TranscriptIndexer(tmp_path)
+    for name, text in corpus.items():
+        indexer.add(write_transcript(tmp_path, name, text))
+    indexer.save()
+
+    saved = LSHIndex.load(tmp_path / transcript_dedupe.INDEX_FILE)
+    assert sorted(saved.names) == sorted(corpus)
+    assert saved.find_matches()[0] == [["original.txt", "reupload.txt"]]
+    assert len(indexer.refresh()) == len(corpus)
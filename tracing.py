@@ -0,0 +1,241 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+# Set YTDL_TRACE=trace.json to record spans for a run. The Chrome trace is
+# written to that path on exit (open it in chrome://tracing or Perfetto) and a
+# per-stage summary is printed to stderr.
+TRACE_ENV = "YTDL_TRACE"
+
+_enabled = False
+_output_path = None
+_events = []
+_lock = threading.Lock()
+_local = threading.local()
+_pid = os.getpid()
+_epoch = time.perf_counter()
+
+
+def _now_us():
+    return (time.perf_counter() - _epoch) * 1e6
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _record(name, start_us, dur_us, self_us, args=None):
+    event = {
+        "name": name,
+        "ph": "X",
+        "ts": start_us,
+        "dur": dur_us,
+        "pid": _pid,
+        "tid": threading.get_ident(),
+        "self": self_us,
+    }
+    if args:
+        event["args"] = args
+    with _lock:
+        _events.append(event)
+
+
+def _record_child(name, start_us, dur_us, args=None):
+    """Record a leaf event timed outside a `with` block (e.g. from a yt-dlp
+    hook) and credit it to the enclosing span so its self time stays right."""
+    stack = _stack()
+    if stack:
+        stack[-1].child_us += dur_us
+    _record(name, start_us, dur_us, dur_us, args)
+
+
+class _Span:
+    __slots__ = ("name", "args", "start", "child_us")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.child_us = 0.0
+
+    def __enter__(self):
+        _stack().append(self)
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dur = _now_us() - self.start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_us += dur
+        _record(self.name, self.start, dur, dur - self.child_us, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(output_path=None):
+    """Start recording spans; the trace is written to output_path on exit."""
+    global _enabled, _output_path
+    if output_path:
+        _output_path = output_path
+    if not _enabled:
+        _enabled = True
+        atexit.register(_flush)
+
+
+def span(name, **args):
+    """Time a block: `with span("stage"): ...`. A shared no-op when disabled."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args or None)
+
+
+def traced(name=None):
+    """Decorator form of span(), named after the function by default."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, None):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_ydl_hooks(ydl_opts):
+    """Add progress/postprocessor hooks that time transfers and FFmpeg steps."""
+    if not _enabled:
+        return ydl_opts
+
+    transfers = {}
+    postprocessors = {}
+
+    def progress(d):
+        key = d.get("filename")
+        if d["status"] == "downloading":
+            transfers.setdefault(key, _now_us())
+        elif d["status"] in ("finished", "error") and key in transfers:
+            start = transfers.pop(key)
+            dur = _now_us() - start
+            args = {"file": os.path.basename(key or ""), "status": d["status"]}
+            if d.get("total_bytes"):
+                args["bytes"] = d["total_bytes"]
+            _record_child("network_transfer", start, dur, args)
+
+    def postprocess(d):
+        key = d.get("postprocessor")
+        if d["status"] == "started":
+            postprocessors[key] = _now_us()
+        elif d["status"] == "finished" and key in postprocessors:
+            start = postprocessors.pop(key)
+            dur = _now_us() - start
+            _record_child(f"postprocess:{key}", start, dur)
+
+    ydl_opts.setdefault("progress_hooks", []).append(progress)
+    ydl_opts.setdefault("postprocessor_hooks", []).append(postprocess)
+    return ydl_opts
+
+
+def instrument_ydl(ydl):
+    """Wrap a YoutubeDL instance's format selector in a "format_selection" span."""
+    if not _enabled:
+        return ydl
+
+    def wrap_selector(selector):
+        def timed(ctx):
+            with _Span("format_selection", None):
+                return list(selector(ctx))
+        return timed
+
+    if callable(getattr(ydl, "format_selector", None)):
+        ydl.format_selector = wrap_selector(ydl.format_selector)
+    else:
+        # No explicit format: yt-dlp builds the default selector per video.
+        build = ydl.build_format_selector
+        ydl.build_format_selector = lambda spec: wrap_selector(build(spec))
+    return ydl
+
+
+def chrome_trace():
+    """Return the recorded spans as a Chrome trace-event document."""
+    with _lock:
+        events = [{k: v for k, v in e.items() if k != "self"} for e in _events]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def summary():
+    """Aggregate spans per stage: count, total/self/mean/max time in ms."""
+    stages = {}
+    with _lock:
+        events = list(_events)
+    for e in events:
+        s = stages.setdefault(e["name"], {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0})
+        dur_ms = e["dur"] / 1000
+        s["count"] += 1
+        s["total_ms"] += dur_ms
+        s["self_ms"] += e["self"] / 1000
+        s["max_ms"] = max(s["max_ms"], dur_ms)
+    for s in stages.values():
+        s["mean_ms"] = s["total_ms"] / s["count"]
+    return dict(sorted(stages.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+
+
+def format_summary(stages=None):
+    stages = summary() if stages is None else stages
+    lines = [
+        f"{'Stage':<36} {'Count':>6} {'Total ms':>11} {'Self ms':>11} {'Mean ms':>10} {'Max ms':>10}",
+        "-" * 89,
+    ]
+    for name, s in stages.items():
+        lines.append(
+            f"{name[:36]:<36} {s['count']:>6} {s['total_ms']:>11.2f} {s['self_ms']:>11.2f} "
+            f"{s['mean_ms']:>10.2f} {s['max_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def write_chrome_trace(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+
+
+def _flush():
+    if not _events:
+        return
+    if _output_path:
+        write_chrome_trace(_output_path)
+        print(f"\n[trace] Chrome trace written to {_output_path}", file=sys.stderr)
+    print("\n[trace] Per-stage summary", file=sys.stderr)
+    print(format_summary(), file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
@@ -0,0 +1,595 @@
+import os
+import re
+import sys
+import time
+import zipfile
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+import numpy as np
+
+import tracing
+
+INDEX_FILE = ".minhash.npz"
+
+NUM_PERM = 128
+BANDS = 32          # 32 bands x 4 rows -> candidate threshold around 0.42
+SHINGLE_SIZE = 5    # words per shingle
+THRESHOLD = 0.5
+SEED = 1
+INDEX_VERSION = 2   # bump when shingling changes so saved indexes are rebuilt
+
+# Containment index: MinHash of overlapping windows of each transcript. A
+# transcript contained in a longer one (a supercut) has low whole-document
+# Jaccard, but its windows closely match windows of the longer one. Re-cut
+# footage only gives window similarities around 0.3, hence the low threshold.
+WINDOW = 200        # shingles per window, windows overlap by half
+WINDOW_PERM = 96
+WINDOW_BANDS = 32   # 32 bands x 3 rows -> candidate threshold around 0.31
+WINDOW_MATCH = 0.5  # window similarity that counts as "present in the other"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHINGLE_BASE = np.uint64(1000003)
+_HEADER_RE = re.compile(r"^(Title|URL):.*$", re.MULTILINE)
+# Caption preamble left in every body by captions.vtt_to_text
+_PREAMBLE_RE = re.compile(r"^\s*WEBVTT\b(\s+Kind:\s*\S+)?(\s+Language:\s*\S+)?")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _permutations(num_perm=NUM_PERM, seed=SEED):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations()
+
+
+def read_transcript(path):
+    """Return the transcript body without the Title:/URL: header lines and
+    the WEBVTT preamble, which every transcript would otherwise share."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return _PREAMBLE_RE.sub("", _HEADER_RE.sub("", f.read()))
+
+
+def shingle_sequence(text, k=SHINGLE_SIZE):
+    """Hash each k-word shingle of text to 32 bits, in text order.
+
+    Distinct shingles can collide on the same hash; at transcript sizes this
+    only nudges the similarity estimates.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words))
+    k = min(k, len(words))
+    n = len(words) - k + 1
+
+    # Polynomial rolling combination of k consecutive word hashes (wraps mod 2**64).
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = h * _SHINGLE_BASE + word_hashes[j:j + n]
+    return h & _MAX_HASH
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """Sorted distinct shingle hashes of text (see shingle_sequence)."""
+    return np.unique(shingle_sequence(text, k))
+
+
+def minhash(shingles, a=_PERM_A, b=_PERM_B):
+    """MinHash signature of a shingle set: one row of len(a) uint32 values."""
+    if shingles.size == 0:
+        return np.full(len(a), _MAX_HASH, dtype=np.uint64)
+    hv = (np.outer(a, shingles) + b[:, None]) % _MERSENNE_PRIME
+    return (hv & _MAX_HASH).min(axis=1)
+
+
+def window_minhashes(sequence, a, b, window=WINDOW):
+    """MinHash signatures of overlapping windows of a shingle sequence.
+
+    Windows are `window` shingles long with a stride of window / 2, so any
+    stretch of window shingles shares at least three quarters of a window.
+    Returns an array of shape (windows, len(a)).
+    """
+    if sequence.size == 0:
+        return np.full((1, len(a)), _MAX_HASH, dtype=np.uint64)
+    half = max(1, window // 2)
+    hv = ((np.outer(a, sequence) + b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+    blocks = np.minimum.reduceat(hv, np.arange(0, sequence.size, half), axis=1).T
+    if len(blocks) == 1:
+        return blocks
+    return np.minimum(blocks[:-1], blocks[1:])
+
+
+class LSHIndex:
+    """MinHash signatures for a transcript folder, bucketed by LSH bands.
+
+    Whole-transcript signatures find near-duplicates; window signatures find
+    transcripts mostly contained in a longer one. The index is saved next to
+    the transcripts (INDEX_FILE) so later runs only re-hash files that are new
+    or changed since the last update.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE,
+                 window=WINDOW, window_perm=WINDOW_PERM, window_bands=WINDOW_BANDS):
+        if num_perm % bands or window_perm % window_bands:
+            raise ValueError("permutation counts must be divisible by their band counts")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.window = window
+        self.window_perm = window_perm
+        self.window_bands = window_bands
+        self.window_rows = window_perm // window_bands
+        self.a, self.b = _permutations(num_perm)
+        self.wa, self.wb = _permutations(window_perm, SEED + 1)
+
+        self.names = []
+        self.stamps = []            # (mtime_ns, size) used to spot changed files
+        self.shingle_counts = []
+        self.signatures = []
+        self.window_signatures = []
+        self._buckets = defaultdict(list)
+        self._window_buckets = defaultdict(list)
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def settings(self):
+        return (self.num_perm, self.bands, self.shingle_size,
+                self.window, self.window_perm, self.window_bands)
+
+    @staticmethod
+    def _band_keys(signature, bands, rows):
+        return [(i, signature[i * rows:(i + 1) * rows].tobytes()) for i in range(bands)]
+
+    def _keys(self, i):
+        """(whole-document band keys, window band keys) of document i."""
+        keys = self._band_keys(self.signatures[i], self.bands, self.rows)
+        window_keys = {
+            key
+            for signature in self.window_signatures[i]
+            for key in self._band_keys(signature, self.window_bands, self.window_rows)
+        }
+        return keys, window_keys
+
+    def _bucket(self, i):
+        # Empty transcripts all share the same signature; keep them out.
+        if not self.shingle_counts[i]:
+            return
+        keys, window_keys = self._keys(i)
+        for key in keys:
+            self._buckets[key].append(i)
+        for key in window_keys:
+            self._window_buckets[key].append(i)
+
+    def _unbucket(self, i):
+        if not self.shingle_counts[i]:
+            return
+        keys, window_keys = self._keys(i)
+        for buckets, doc_keys in ((self._buckets, keys), (self._window_buckets, window_keys)):
+            for key in doc_keys:
+                members = buckets[key]
+                members.remove(i)
+                if not members:
+                    del buckets[key]
+
+    def _rebuild_buckets(self):
+        self._buckets = defaultdict(list)
+        self._window_buckets = defaultdict(list)
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        for i in range(len(self.names)):
+            self._bucket(i)
+
+    def add(self, name, text, stamp=(0, 0)):
+        """Insert or replace one document."""
+        sequence = shingle_sequence(text, self.shingle_size)
+        shingles = np.unique(sequence)
+        signature = minhash(shingles, self.a, self.b)
+        windows = window_minhashes(sequence, self.wa, self.wb, self.window)
+
+        if name in self._positions:
+            i = self._positions[name]
+            self._unbucket(i)
+            self.signatures[i] = signature
+            self.window_signatures[i] = windows
+            self.stamps[i] = stamp
+            self.shingle_counts[i] = int(shingles.size)
+            self._bucket(i)
+            return
+
+        i = len(self.names)
+        self.names.append(name)
+        self.stamps.append(stamp)
+        self.shingle_counts.append(int(shingles.size))
+        self.signatures.append(signature)
+        self.window_signatures.append(windows)
+        self._positions[name] = i
+        self._bucket(i)
+
+    def remove(self, names):
+        """Drop documents by name; return how many were removed."""
+        gone = set(names) & set(self._positions)
+        if not gone:
+            return 0
+        keep = [i for i, name in enumerate(self.names) if name not in gone]
+        self.names = [self.names[i] for i in keep]
+        self.stamps = [self.stamps[i] for i in keep]
+        self.shingle_counts = [self.shingle_counts[i] for i in keep]
+        self.signatures = [self.signatures[i] for i in keep]
+        self.window_signatures = [self.window_signatures[i] for i in keep]
+        self._rebuild_buckets()
+        return len(gone)
+
+    @staticmethod
+    def _pairs(buckets):
+        pairs = set()
+        for members in buckets.values():
+            if len(members) > 1:
+                pairs.update(combinations(sorted(set(members)), 2))
+        return pairs
+
+    def candidate_pairs(self):
+        """Index pairs that share at least one whole-transcript LSH bucket."""
+        return self._pairs(self._buckets)
+
+    def containment_candidate_pairs(self):
+        """Index pairs with at least one pair of windows in the same LSH bucket."""
+        return self._pairs(self._window_buckets)
+
+    def similarity(self, i, j):
+        """Estimated Jaccard similarity of documents i and j (0 if either is empty)."""
+        if not self.shingle_counts[i] or not self.shingle_counts[j]:
+            return 0.0
+        return float(np.mean(self.signatures[i] == self.signatures[j]))
+
+    def containment(self, i, j, jaccard=None):
+        """Estimated share of the smaller document's shingles found in the other.
+
+        Takes the larger of two estimates: one derived from whole-document
+        similarity and sizes, and the share of the smaller document's windows
+        that match a window of the larger one (at least WINDOW_MATCH). The
+        first undercounts long, tightly contained runs; the second undercounts
+        content that was re-cut across windows.
+        """
+        if self.shingle_counts[i] > self.shingle_counts[j]:
+            i, j = j, i
+        ni, nj = self.shingle_counts[i], self.shingle_counts[j]
+        if not ni:
+            return 0.0
+        if jaccard is None:
+            jaccard = self.similarity(i, j)
+        from_jaccard = min(1.0, jaccard / (1 + jaccard) * (ni + nj) / ni)
+
+        small, big = self.window_signatures[i], self.window_signatures[j]
+        best = (small[:, None, :] == big[None, :, :]).mean(axis=2).max(axis=1)
+        return max(from_jaccard, float(np.mean(best >= WINDOW_MATCH)))
+
+    def duplicate_pairs(self, threshold=THRESHOLD):
+        """(i, j, similarity) for candidate pairs at or above threshold."""
+        pairs = []
+        for i, j in self.candidate_pairs():
+            jaccard = self.similarity(i, j)
+            if jaccard >= threshold:
+                pairs.append((i, j, jaccard))
+        return pairs
+
+    def overlap_pairs(self, threshold=THRESHOLD):
+        """(small, big, similarity, containment) for pairs that are not
+        near-duplicates but where most of the smaller document is contained
+        in the larger one (e.g. supercuts)."""
+        pairs = []
+        for i, j in self.containment_candidate_pairs() | self.candidate_pairs():
+            jaccard = self.similarity(i, j)
+            if jaccard >= threshold:
+                continue
+            contained = self.containment(i, j, jaccard)
+            if contained >= threshold:
+                small, big = (i, j) if self.shingle_counts[i] <= self.shingle_counts[j] else (j, i)
+                pairs.append((small, big, jaccard, contained))
+        return pairs
+
+    def find_matches(self, threshold=THRESHOLD):
+        """Return (duplicate clusters, overlaps) as lists of names.
+
+        Near-duplicate pairs are merged into clusters; overlaps are
+        (smaller, larger, similarity, containment) tuples.
+        """
+        parent = list(range(len(self.names)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j, _ in self.duplicate_pairs(threshold):
+            parent[find(i)] = find(j)
+
+        groups = defaultdict(list)
+        for i in range(len(self.names)):
+            groups[find(i)].append(self.names[i])
+        clusters = sorted((sorted(g) for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+        overlaps = [
+            (self.names[small], self.names[big], jaccard, contained)
+            for small, big, jaccard, contained in self.overlap_pairs(threshold)
+        ]
+        overlaps.sort(key=lambda o: o[3], reverse=True)
+        return clusters, overlaps
+
+    def save(self, path):
+        """Write the index to path atomically (via a temp file and os.replace)."""
+        window_counts = [len(w) for w in self.window_signatures]
+        windows = (np.concatenate(self.window_signatures) if self.window_signatures
+                   else np.zeros((0, self.window_perm), dtype=np.uint64))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            self._write(f, window_counts, windows)
+        os.replace(tmp_path, path)
+
+    def _write(self, f, window_counts, windows):
+        np.savez(
+            f,
+            params=np.array(self.settings() + (SEED, INDEX_VERSION), dtype=np.int64),
+            names=np.array(self.names, dtype=np.str_),
+            stamps=np.array(self.stamps, dtype=np.int64).reshape(-1, 2),
+            shingle_counts=np.array(self.shingle_counts, dtype=np.int64),
+            signatures=np.array(self.signatures, dtype=np.uint64).reshape(-1, self.num_perm),
+            window_counts=np.array(window_counts, dtype=np.int64),
+            window_signatures=windows,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return None if it is missing, unreadable or
+        was built with other settings (the caller then rebuilds it)."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                params = [int(v) for v in data["params"]]
+                if len(params) != 8 or params[-2:] != [SEED, INDEX_VERSION]:
+                    return None
+                index = cls(*params[:-2])
+                index.names = [str(n) for n in data["names"]]
+                index.stamps = [tuple(int(v) for v in s) for s in data["stamps"]]
+                index.shingle_counts = [int(c) for c in data["shingle_counts"]]
+                index.signatures = list(data["signatures"])
+                offsets = np.cumsum(data["window_counts"])[:-1]
+                index.window_signatures = np.split(data["window_signatures"], offsets) if index.names else []
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+        if not (len(index.names) == len(index.stamps) == len(index.shingle_counts)
+                == len(index.signatures) == len(index.window_signatures)):
+            return None
+        index._rebuild_buckets()
+        return index
+
+
+def _transcript_files(directory):
+    return sorted(f for f in os.listdir(directory) if f.endswith(".txt"))
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def add_transcript(index, directory, name):
+    """(Re)hash one transcript if it changed since it was indexed; return True if it did."""
+    file_path = os.path.join(directory, name)
+    stamp = _stamp(file_path)
+    i = index._positions.get(name)
+    if i is not None and index.stamps[i] == stamp:
+        return False
+    with tracing.span("minhash", file=name):
+        index.add(name, read_transcript(file_path), stamp)
+    return True
+
+
+def save_index(index, directory):
+    index.save(os.path.join(directory, INDEX_FILE))
+
+
+def load_index(directory, **settings):
+    """Return the saved index for directory without hashing anything, or an
+    empty index if there is none usable. Keyword arguments go to LSHIndex."""
+    fresh = LSHIndex(**settings)
+    index = LSHIndex.load(os.path.join(directory, INDEX_FILE))
+    if index is None or index.settings() != fresh.settings():
+        return fresh
+    return index
+
+
+@tracing.traced("update_index")
+def update_index(directory, index=None, **settings):
+    """Bring the index for directory up to date, save it and return it.
+
+    Uses `index` if given, otherwise the saved one (see load_index). Only
+    transcripts that were added or modified since they were indexed are
+    re-hashed; deleted transcripts are dropped.
+    """
+    if index is None:
+        index = load_index(directory, **settings)
+
+    files = _transcript_files(directory)
+    present = set(files)
+    removed = index.remove([name for name in index.names if name not in present])
+
+    changed = sum(add_transcript(index, directory, name) for name in files)
+
+    if changed or removed:
+        save_index(index, directory)
+    print(f"Index: {len(index)} transcripts ({changed} new or updated, {removed} removed)")
+    return index
+
+
+class TranscriptIndexer:
+    """Adds transcripts to a directory's index as a scraper saves them.
+
+    The saved index is loaded on a background thread so it does not hold up
+    the scrape; transcripts saved before it is ready are added once it is.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending = []
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._index = self._executor.submit(load_index, directory)
+
+    def add(self, path):
+        self.pending.append(os.path.basename(path))
+        if self._index.done():
+            self._add_pending()
+
+    def _add_pending(self):
+        index = self._index.result()
+        while self.pending:
+            add_transcript(index, self.directory, self.pending.pop(0))
+        return index
+
+    def save(self):
+        save_index(self._add_pending(), self.directory)
+
+    def refresh(self):
+        """Hash whatever else changed in the directory (first run, files added by hand)."""
+        index = update_index(self.directory, self._add_pending())
+        self._executor.shutdown()
+        return index
+
+
+def report(index, threshold=THRESHOLD):
+    clusters, overlaps = index.find_matches(threshold)
+
+    print(f"\nNear-duplicate clusters (similarity >= {threshold}): {len(clusters)}")
+    for n, cluster in enumerate(clusters, 1):
+        print(f"\n[{n}]")
+        for name in cluster:
+            print(f"    {name}")
+
+    print(f"\nOverlapping transcripts (containment >= {threshold}): {len(overlaps)}")
+    for small, big, jaccard, contained in overlaps:
+        print(f"    {small}\n      {contained:.0%} contained in {big} (similarity {jaccard:.2f})")
+
+
+def _exact_pairs(shingle_sets, threshold):
+    """All-pairs ground truth from exact shingle sets via an inverted index.
+
+    Returns (pairs with Jaccard >= threshold, pairs below it whose containment
+    of the smaller set is >= threshold).
+    """
+    postings = defaultdict(list)
+    for i, shingles in enumerate(shingle_sets):
+        for h in shingles.tolist():
+            postings[h].append(i)
+
+    shared = Counter()
+    for docs in postings.values():
+        if len(docs) > 1:
+            shared.update(combinations(docs, 2))
+
+    duplicates, overlaps = set(), set()
+    for (i, j), inter in shared.items():
+        ni, nj = len(shingle_sets[i]), len(shingle_sets[j])
+        if inter / (ni + nj - inter) >= threshold:
+            duplicates.add((i, j))
+        elif inter / min(ni, nj) >= threshold:
+            overlaps.add((i, j))
+    return duplicates, overlaps
+
+
+def _recall(found, truth):
+    return len(found & truth) / len(truth) if truth else 1.0
+
+
+def benchmark(directory, threshold=THRESHOLD, supercuts=5):
+    """Compare LSH results with an exact all-pairs comparison.
+
+    Adds `supercuts` synthetic transcripts, each made of three random real
+    ones, so that containment recall is measured on known overlaps.
+    """
+    files = _transcript_files(directory)
+    texts = {name: read_transcript(os.path.join(directory, name)) for name in files}
+    rng = np.random.default_rng(SEED)
+    for k in range(min(supercuts, len(files) // 3)):
+        picks = rng.choice(len(files), size=3, replace=False)
+        texts[f"<supercut {k + 1}>"] = " ".join(texts[files[p]] for p in picks)
+    names = list(texts)
+    n = len(names)
+    all_pairs = n * (n - 1) // 2
+
+    start = time.perf_counter()
+    index = LSHIndex()
+    for name in names:
+        index.add(name, texts[name])
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidates = index.candidate_pairs()
+    window_candidates = index.containment_candidate_pairs()
+    lsh_duplicates = {(i, j) for i, j, _ in index.duplicate_pairs(threshold)}
+    lsh_overlaps = {tuple(sorted(p[:2])) for p in index.overlap_pairs(threshold)}
+    lsh_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    shingle_sets = [shingle_hashes(texts[name]) for name in names]
+    true_duplicates, true_overlaps = _exact_pairs(shingle_sets, threshold)
+    exact_time = time.perf_counter() - start
+
+    print(f"Transcripts:            {n} ({n - len(files)} synthetic supercuts)")
+    print(f"Signature build:        {build_time:.3f} s ({build_time / max(n, 1) * 1000:.2f} ms/file)")
+    print(f"Duplicate candidates:   {len(candidates)} of {all_pairs} pairs")
+    print(f"Containment candidates: {len(window_candidates)} of {all_pairs} pairs")
+    print(f"LSH query:              {lsh_time * 1000:.2f} ms")
+    print(f"Exact all-pairs:        {exact_time * 1000:.2f} ms")
+    print(f"Duplicates >= {threshold}:     {len(true_duplicates)} exact, {len(lsh_duplicates)} found "
+          f"(recall {_recall(lsh_duplicates, true_duplicates):.0%}, "
+          f"{len(lsh_duplicates - true_duplicates)} false positives)")
+    print(f"Overlaps >= {threshold}:       {len(true_overlaps)} exact, {len(lsh_overlaps)} found "
+          f"(recall {_recall(lsh_overlaps, true_overlaps):.0%}, "
+          f"{len(lsh_overlaps - true_overlaps)} false positives)")
+    missed = true_overlaps - lsh_overlaps
+    for i, j in sorted(missed):
+        print(f"    missed overlap: {names[i]} / {names[j]}")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ("-h", "--help"):
+        print("Usage: python transcript_dedupe.py <transcript_dir> [threshold] [--benchmark]")
+        print("Example: python transcript_dedupe.py Veritasium 0.5")
+        return
+
+    run_benchmark = "--benchmark" in args
+    args = [a for a in args if a != "--benchmark"]
+    directory = args[0]
+    if not os.path.isdir(directory):
+        print(f"Error: '{directory}' is not a directory.")
+        return
+
+    try:
+        threshold = float(args[1]) if len(args) > 1 else THRESHOLD
+    except ValueError:
+        threshold = None
+    if threshold is None or not 0 < threshold <= 1:
+        print("Error: Threshold must be a number between 0 and 1")
+        return
+
+    if run_benchmark:
+        benchmark(directory, threshold)
+        return
+
+    index = update_index(directory)
+    report(index, threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import re
 from typing import Optional, List
 from yt_dlp import YoutubeDL
 
+import tracing
+
 
 def parse_time(t: Optional[str]) -> Optional[str]:
     """Accepts seconds (int/float) or HH:MM:SS and returns HH:MM:SS or None."""
@@ -37,7 +39,9 @@ def parse_time(t: Optional[str]) -> Optional[str]:
 def list_formats(url: str) -> List[dict]:
     ydl_opts = {"quiet": True, "no_warnings": True}
     with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
+        tracing.instrument_ydl(ydl)
+        with tracing.span("extract_info", url=url):
+            info = ydl.extract_info(url, download=False)
 
     formats = info.get("formats", [])
     seen = set()
@@ -102,8 +106,15 @@ def download_video(
         print("⚠️ FFmpeg not found — merging and trimming may fail.")
         print("Install FFmpeg and ensure it's in PATH.")
 
+    tracing.add_ydl_hooks(ydl_opts)
+
     with YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+        tracing.instrument_ydl(ydl)
+        # Same as ydl.download([url]), split so extraction is timed on its own
+        with tracing.span("extract_info", url=url):
+            info = ydl.extract_info(url, download=False, process=False)
+        with tracing.span("download", url=url, format=format_selector):
+            ydl.process_ie_result(info, download=True)
 
 
 def download_subtitles(
@@ -129,8 +140,14 @@ def download_subtitles(
 
     print(f"Downloading subtitles: lang={lang}, auto={write_english_automatic}")
 
+    tracing.add_ydl_hooks(ydl_opts)
+
     with YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+        tracing.instrument_ydl(ydl)
+        with tracing.span("extract_info", url=url):
+            info = ydl.extract_info(url, download=False, process=False)
+        with tracing.span("download_subtitles", url=url, lang=lang):
+            ydl.process_ie_result(info, download=True)
 
 
 def check_ffmpeg_available() -> bool: